@@ -2,43 +2,320 @@
 
 import requests
 import xmltodict
+import orjson
+import numpy as np
 import math
 import logging
+import functools
 import time
-import pytz
-import geopy
+import threading
+
+from typing import Dict, List, Any, Iterable, Tuple, Union
+from array import array
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from lxml import etree
+from numba import njit
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
+from requests.adapters import HTTPAdapter
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider that encodes with orjson, which is faster than the stdlib
+    encoder on float-heavy payloads and serializes NumPy values directly
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
-from typing import Dict, List, Any, Tuple
-from datetime import datetime
-from astropy import coordinates, units
-from astropy.time import Time
-from astropy import constants as const
-from geopy.geocoders import Nominatim
-from flask import Flask, request
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.option), mimetype='application/json')
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 url = "https://nasa-public-data.s3.amazonaws.com/iss-coords/current/ISS_OEM/ISS.OEM_J2K_EPH.xml"
-geocoder = Nominatim(user_agent="iss_tracker")
+
+_UNIX_EPOCH = datetime(1970, 1, 1)
+_UNIX_EPOCH_ORDINAL = _UNIX_EPOCH.toordinal()
+_MICROSECOND = timedelta(microseconds=1)
+
+# One keep-alive connection pool, so refreshes don't pay a new TCP+TLS handshake
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+# Formatted data keys and the XML tags they are read from
+_STATE_VECTOR_TAGS = {'x': 'X', 'y': 'Y', 'z': 'Z', 'dx': 'X_DOT', 'dy': 'Y_DOT', 'dz': 'Z_DOT'}
+_TIMESTAMP_DTYPE = 'U26' # 'YYYY-MM-DD HH:MM:SS.ffffff'
+
+CACHE_TTL = 60 # seconds
+FETCH_TIMEOUT = (5, 30) # seconds to connect, seconds between bytes read
+FETCH_RETRY = 5 # seconds before retrying a first fetch that failed
+PREFIX_CHUNK_SIZE = 65536 # bytes, enough for the header, metadata and comments
+_CACHE = {"etag": None, "content": None, "data": None, "arrays": None, "index": None, "json": None, "closest": None, "expires": 0,
+          "prefix": None, "prefix_expires": 0}
+_CACHE_LOCK = threading.RLock()
+# Held by the one thread downloading a new file, so the cache lock is never held across the network
+_REFRESH_LOCK = threading.Lock()
+
+def _synchronized(func):
+    """
+    Decorator that runs the function while holding the cache lock, so concurrent
+    requests on a threaded server share one parse instead of racing
+
+    Args:
+        func: The function to wrap
+
+    Returns:
+        The wrapped function
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _CACHE_LOCK:
+            return func(*args, **kwargs)
+    return wrapper
+
+def _fetch_content() -> bytes:
+    """
+    Fetches the raw XML from the url variable. The response is cached for
+    CACHE_TTL seconds, after which the url is re-requested conditionally on its
+    ETag so an unchanged file isn't downloaded or re-parsed. Only one thread
+    refreshes at a time, and the cache lock isn't held while it downloads: other
+    threads keep being served the previous file, and only wait when there is no
+    file yet at all
+
+    Returns:
+        bytes: The raw XML data
+    """
+    with _CACHE_LOCK:
+        if time.monotonic() < _CACHE['expires']:
+            return _CACHE['content']
+        have_content = _CACHE['content'] is not None
+
+    if not _REFRESH_LOCK.acquire(blocking=not have_content):
+        # Another thread is already refreshing, keep serving the current file meanwhile
+        return _CACHE['content']
+    try:
+        with _CACHE_LOCK:
+            # Another thread may have finished a refresh while this one was waiting
+            if time.monotonic() < _CACHE['expires']:
+                return _CACHE['content']
+            etag = _CACHE['etag'] if _CACHE['content'] is not None else None
+
+        headers = {'If-None-Match': etag} if etag else {}
+        response = None
+        try:
+            response = _SESSION.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+            if (response.status_code != 200 and not (response.status_code == 304 and etag)):
+                raise requests.exceptions.RequestException
+        except requests.exceptions.RequestException as exception:
+            logging.error(f"Error fetching data: {exception} {response}")
+            with _CACHE_LOCK:
+                # Keep serving the last good file (and everything derived from it) until the next retry,
+                # and if there is none yet, back off briefly instead of retrying on every request
+                if _CACHE['content'] is not None:
+                    _CACHE['expires'] = time.monotonic() + CACHE_TTL
+                else:
+                    _CACHE['expires'] = time.monotonic() + FETCH_RETRY
+                return _CACHE['content']
+
+        with _CACHE_LOCK:
+            if (response.status_code == 200):
+                _CACHE['etag'] = response.headers.get('ETag')
+                _CACHE['content'] = response.content
+                _CACHE['data'] = None
+                _CACHE['arrays'] = None
+                _CACHE['index'] = None
+                _CACHE['json'] = None
+                _CACHE['closest'] = None
+                _CACHE['prefix'] = None
+                _CACHE['prefix_expires'] = 0
+            _CACHE['expires'] = time.monotonic() + CACHE_TTL
+            return _CACHE['content']
+    finally:
+        _REFRESH_LOCK.release()
 
 def fetch_data() -> Dict[str, Any]:
     """
-    Fetches data from the url variable and parses it as XML using xmltodict
+    Fetches data from the url variable and parses it as XML using xmltodict.
+    The parsed data is cached alongside the raw XML
 
     Returns:
         Dict[str, Any]: The parsed XML data as a dictionary
     """
-    try:
-        response = requests.get(url)
-        if (response.status_code != 200):
-            raise requests.exceptions.RequestException
-        xml_data = response.text
-        return xmltodict.parse(xml_data)
-    except requests.exceptions.RequestException as exception:
-        logging.error(f"Error fetching data: {exception} {response}")
-        return
-    except xmltodict.expat.ExpatError as exception:
-        logging.error(f"Error parsing XML data: {exception} {response}")
+    _fetch_content()
+    return _cached_data()
+
+@_synchronized
+def _cached_data() -> Dict[str, Any]:
+    """
+    Parses the currently cached XML using xmltodict, without fetching
+
+    Returns:
+        Dict[str, Any]: The parsed XML data as a dictionary
+    """
+    xml_content = _CACHE['content']
+    if xml_content is None:
         return
+    if _CACHE['data'] is None:
+        try:
+            _CACHE['data'] = xmltodict.parse(xml_content, disable_entities=True, force_list=('stateVector', 'COMMENT'))
+        except xmltodict.expat.ExpatError as exception:
+            logging.error(f"Error parsing XML data: {exception}")
+            return
+    return _CACHE['data']
+
+def fetch_prefix() -> Dict[str, Any]:
+    """
+    Fetches only the start of the XML, up to the first state vector, and parses
+    the header, metadata and comments out of it. Reuses the cached full XML if
+    there is one, otherwise streams the response (outside the cache lock) and
+    stops reading early
+
+    Returns:
+        Dict[str, Any]: The header, metadata and comments, shaped like fetch_data's dictionary
+    """
+    with _CACHE_LOCK:
+        now = time.monotonic()
+        if now < _CACHE['prefix_expires']:
+            return _CACHE['prefix']
+        xml_content = _CACHE['content']
+        content_expires = _CACHE['expires']
+
+    if xml_content is not None and now < content_expires:
+        prefix = parse_prefix(xml_content[i:i+PREFIX_CHUNK_SIZE] for i in range(0, len(xml_content), PREFIX_CHUNK_SIZE))
+        prefix_expires = content_expires
+    else:
+        response = None
+        try:
+            response = _SESSION.get(url, stream=True, timeout=FETCH_TIMEOUT)
+            with response:
+                if (response.status_code != 200):
+                    raise requests.exceptions.RequestException
+                prefix = parse_prefix(response.iter_content(PREFIX_CHUNK_SIZE))
+        except requests.exceptions.RequestException as exception:
+            logging.error(f"Error fetching data: {exception} {response}")
+            prefix = None
+        prefix_expires = time.monotonic() + CACHE_TTL
+
+    with _CACHE_LOCK:
+        if prefix is None:
+            # Like _fetch_content, keep serving the last good prefix, and if there is none yet,
+            # back off briefly instead of re-requesting on every /header, /metadata and /comment
+            if _CACHE['prefix'] is None:
+                _CACHE['prefix_expires'] = time.monotonic() + FETCH_RETRY
+            else:
+                _CACHE['prefix_expires'] = time.monotonic() + CACHE_TTL
+            return _CACHE['prefix']
+        # Don't overwrite the reset done by a refresh that landed a newer file meanwhile
+        if _CACHE['content'] is xml_content:
+            _CACHE['prefix'] = prefix
+            _CACHE['prefix_expires'] = prefix_expires
+    return prefix
+
+def get_arrays() -> Dict[str, np.ndarray]:
+    """
+    Returns the state vector arrays for the currently cached XML data, only
+    re-parsing when a new file has been fetched
+
+    Returns:
+        Dict[str, np.ndarray]: The 'timestamp', 'ts', 'x', 'y', 'z', 'dx', 'dy', 'dz' and 'speed' arrays
+    """
+    _fetch_content()
+    return _cached_arrays()
+
+@_synchronized
+def _cached_arrays() -> Dict[str, np.ndarray]:
+    """
+    Returns the state vector arrays for the currently cached XML data, without fetching
+
+    Returns:
+        Dict[str, np.ndarray]: The 'timestamp', 'ts', 'x', 'y', 'z', 'dx', 'dy', 'dz' and 'speed' arrays
+    """
+    xml_content = _CACHE['content']
+    if xml_content is None:
+        return build_arrays([])
+    if _CACHE['arrays'] is None:
+        _CACHE['arrays'] = parse_state_vectors(xml_content)
+    return _CACHE['arrays']
+
+@_synchronized
+def _cached_index() -> Dict[str, int]:
+    """
+    Returns a mapping of timestamp to position in the currently cached state
+    vector arrays (without fetching), so single epochs can be looked up without
+    scanning. Timestamps are keyed in their URL form ('YYYY-MM-DD__HH_MM_SS.SSSSSS')
+    so route parameters can be looked up as they arrive
+
+    Returns:
+        Dict[str, int]: The index of each epoch keyed by its URL timestamp
+    """
+    arrays = _cached_arrays()
+    if _CACHE['index'] is None:
+        index = {}
+        for i, timestamp in enumerate(arrays['timestamp'].tolist()):
+            index.setdefault(timestamp.replace(" ", "__").replace(":", "_"), i)
+        _CACHE['index'] = index
+    return _CACHE['index']
+
+def find_epoch_index(index: Dict[str, int], epoch: str) -> int:
+    """
+    Looks up the position of an epoch in a timestamp index
+
+    Args:
+        index (Dict[str, int]): The index of each epoch keyed by its URL timestamp, from _cached_index
+        epoch (str): The timestamp for the epoch in format 'YYYY-MM-DD__HH_MM_SS.SSSSSS'
+        (or 'YYYY-MM-DD HH:MM:SS.SSSSSS')
+
+    Returns:
+        int: The index of the epoch, or None if it isn't in the data
+    """
+    position = index.get(epoch)
+    if position is None:
+        position = index.get(epoch.replace(" ", "__").replace(":", "_"))
+    return position
+
+@_synchronized
+def _cached_epochs_json() -> Tuple[bytes, np.ndarray]:
+    """
+    Returns the currently cached state vector arrays serialized as a JSON list (without
+    fetching), along with where each epoch starts in it, so /epochs can serve any
+    slice without re-encoding
+
+    Returns:
+        Tuple[bytes, np.ndarray]: The JSON list, and the byte offset each epoch starts
+        at (plus a final entry one past the closing bracket's position)
+    """
+    arrays = _cached_arrays()
+    if _CACHE['json'] is None:
+        _CACHE['json'] = serialize_epochs(arrays)
+    return _CACHE['json']
+
+def epoch_dict(arrays: Dict[str, np.ndarray], index: int) -> Dict[str, Any]:
+    """
+    Builds the dictionary for a single epoch out of the state vector arrays
+
+    Args:
+        arrays (Dict[str, np.ndarray]): The state vector arrays
+        index (int): The position of the epoch
+
+    Returns:
+        Dict[str, Any]: The epoch's timestamp and state vector, as in format_data
+    """
+    return {
+        'timestamp': str(arrays['timestamp'][index]),
+        'x': float(arrays['x'][index]),
+        'y': float(arrays['y'][index]),
+        'z': float(arrays['z'][index]),
+        'dx': float(arrays['dx'][index]),
+        'dy': float(arrays['dy'][index]),
+        'dz': float(arrays['dz'][index]),
+    }
 
 def format_header(data_dict: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -101,6 +378,53 @@ def format_metadata(data_dict: Dict[str, Any]) -> Dict[str, Any]:
     return formatted_metadata
 
 
+@functools.lru_cache(maxsize=1024)
+def _calendar_date(year: int, day_of_year: int) -> Tuple[str, int]:
+    """
+    Converts a year and day of year to a 'YYYY-MM-DD' date string
+
+    Args:
+        year (int): The year
+        day_of_year (int): The day of the year, starting at 1
+
+    Returns:
+        Tuple[str, int]: The calendar date, and the number of days since the Unix epoch
+    """
+    if not 1 <= day_of_year <= 366:
+        raise ValueError(f"Day of year out of range: {day_of_year}")
+    day = date.fromordinal(date(year, 1, 1).toordinal() + day_of_year - 1)
+    return day.isoformat(), day.toordinal() - _UNIX_EPOCH_ORDINAL
+
+def _parse_epoch(epoch: str) -> Tuple[str, int]:
+    """
+    Reformats an OEM epoch ('YYYY-DDDTHH:MM:SS.ffffffZ') as 'YYYY-MM-DD HH:MM:SS.ffffff'
+    and converts it to microseconds since the Unix epoch. The fields are fixed width
+    so they are sliced out directly rather than going through strptime/strftime
+
+    Args:
+        epoch (str): The EPOCH string of a state vector
+
+    Returns:
+        Tuple[str, int]: The reformatted timestamp, and microseconds since 1970-01-01 00:00:00 UTC
+    """
+    fraction = epoch[18:-1]
+    if (len(epoch) < 20 or epoch[4] != '-' or epoch[8] != 'T' or epoch[11] != ':' or epoch[14] != ':'
+            or epoch[17] != '.' or epoch[-1] != 'Z' or not 1 <= len(fraction) <= 6 or not fraction.isdigit()):
+        raise ValueError(f"Unexpected epoch format: {epoch}")
+
+    # int() alone would also take signs and spaces, which strptime rejects
+    fields = (epoch[0:4], epoch[5:8], epoch[9:11], epoch[12:14], epoch[15:17])
+    if not all(field.isdigit() for field in fields):
+        raise ValueError(f"Unexpected epoch format: {epoch}")
+    year, day_of_year, hour, minute, second = map(int, fields)
+    if hour > 23 or minute > 59 or second > 59:
+        raise ValueError(f"Unexpected epoch format: {epoch}")
+
+    fraction = f"{fraction:0<6}"
+    day, days = _calendar_date(year, day_of_year)
+    timestamp = f"{day} {hour:02d}:{minute:02d}:{second:02d}.{fraction}"
+    return timestamp, (((days * 24 + hour) * 60 + minute) * 60 + second) * 1000000 + int(fraction)
+
 def format_data(data_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Parses/formats the XML dictionary into a list of dictionaries
@@ -121,10 +445,8 @@ def format_data(data_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
 
     for stateVector in data_list:
         try:
-            timestamp = datetime.strptime(stateVector['EPOCH'], "%Y-%jT%H:%M:%S.%fZ")
-            timestamp = datetime.strftime(timestamp, '%Y-%m-%d %H:%M:%S.%f')
             formatted_data.append({
-                'timestamp': timestamp,
+                'timestamp': _parse_epoch(stateVector['EPOCH'])[0],
                 'x': float(stateVector['X']['#text']),
                 'y': float(stateVector['Y']['#text']),
                 'z': float(stateVector['Z']['#text']),
@@ -141,17 +463,255 @@ def format_data(data_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
 
     return formatted_data
 
-def calculate_data_range(formatted_data: List[Dict[str, Any]]) -> Tuple[str, str]:
+def _timestamp_us(timestamp: str) -> int:
     """
-    Calculates the range of data based on the first and last timestamps
+    Converts a formatted timestamp ('YYYY-MM-DD HH:MM:SS.ffffff', UTC) to microseconds
+    since the Unix epoch. Microseconds keep the full OEM precision while fitting
+    any year in an int64, unlike nanoseconds
+
+    Args:
+        timestamp (str): The formatted timestamp
+
+    Returns:
+        int: Microseconds since 1970-01-01 00:00:00 UTC
+    """
+    return (datetime.fromisoformat(timestamp) - _UNIX_EPOCH) // _MICROSECOND
+
+def _query_timestamp_us(value: str, end_of_day: bool = False) -> int:
+    """
+    Converts a URL-form timestamp ('YYYY-MM-DD__HH_MM_SS.SSSSSS', or a prefix of it)
+    from a query parameter to microseconds since the Unix epoch
+
+    Args:
+        value (str): The URL-form timestamp
+        end_of_day (bool): Whether a bare date ('YYYY-MM-DD') means the last microsecond
+        of that day rather than midnight, so it can be used as an inclusive upper bound
+
+    Returns:
+        int: Microseconds since 1970-01-01 00:00:00 UTC
+    """
+    timestamp = value.replace("__", " ").replace("_", ":")
+    parsed = datetime.fromisoformat(timestamp)
+    if end_of_day and len(timestamp) == 10:
+        parsed += timedelta(days=1) - _MICROSECOND
+    return (parsed - _UNIX_EPOCH) // _MICROSECOND
+
+def parse_state_vectors(xml_content: bytes) -> Dict[str, np.ndarray]:
+    """
+    Streams the state vectors out of the raw XML with lxml straight into one
+    array per field, without building the whole document tree or a dictionary
+    per epoch
+
+    Args:
+        xml_content (bytes): The raw XML data
+
+    Returns:
+        Dict[str, np.ndarray]: The 'timestamp', 'ts', 'x', 'y', 'z', 'dx', 'dy', 'dz' and 'speed' arrays
+    """
+    timestamps = []
+    ts = array('q')
+    columns = {key: array('d') for key in _STATE_VECTOR_TAGS}
+
+    try:
+        for _, stateVector in etree.iterparse(BytesIO(xml_content), events=('end',), tag='stateVector'):
+            try:
+                timestamp, timestamp_us = _parse_epoch(stateVector.findtext('EPOCH'))
+                values = [float(stateVector.findtext(tag)) for tag in _STATE_VECTOR_TAGS.values()]
+            except (ValueError, TypeError):
+                logging.error("Error: Unable to parse data to the correct format")
+            else:
+                timestamps.append(timestamp)
+                ts.append(timestamp_us)
+                for column, value in zip(columns.values(), values):
+                    column.append(value)
+
+            # Drop parsed state vectors so memory stays bounded
+            stateVector.clear()
+            while stateVector.getprevious() is not None:
+                del stateVector.getparent()[0]
+    except etree.XMLSyntaxError as exception:
+        logging.error(f"Error parsing XML data: {exception}")
+
+    arrays = {key: np.array(column, dtype=np.float64) for key, column in columns.items()}
+    arrays['timestamp'] = np.array(timestamps, dtype=_TIMESTAMP_DTYPE)
+    arrays['ts'] = np.array(ts, dtype=np.int64)
+    arrays['speed'] = _speeds(arrays['dx'], arrays['dy'], arrays['dz'])
+    return arrays
+
+def _element_to_dict(element: etree._Element) -> Any:
+    """
+    Converts an lxml element to the same structure xmltodict would produce for it
+
+    Args:
+        element (etree._Element): The element to convert
+
+    Returns:
+        Any: A dictionary for elements with children or attributes, otherwise the element's text
+    """
+    result = {f'@{key}': value for key, value in element.attrib.items()}
+    for child in element:
+        if not isinstance(child.tag, str):
+            continue
+        value = _element_to_dict(child)
+        if child.tag in result:
+            if not isinstance(result[child.tag], list):
+                result[child.tag] = [result[child.tag]]
+            result[child.tag].append(value)
+        elif child.tag == 'COMMENT':
+            result[child.tag] = [value]
+        else:
+            result[child.tag] = value
+
+    text = element.text.strip() if element.text else ''
+    if not result:
+        return text or None
+    if text:
+        result['#text'] = text
+    return result
+
+def parse_prefix(xml_chunks: Iterable[bytes]) -> Dict[str, Any]:
+    """
+    Incrementally parses XML chunks until the first state vector starts, and
+    returns the header, metadata and comments seen up to that point
+
+    Args:
+        xml_chunks (Iterable[bytes]): The raw XML data, in order
+
+    Returns:
+        Dict[str, Any]: The header, metadata and comments, shaped like fetch_data's dictionary
+    """
+    parser = etree.XMLPullParser(events=('start', 'end'))
+    root = None
+    comments = []
+    reached_state_vectors = False
+
+    try:
+        for chunk in xml_chunks:
+            parser.feed(chunk)
+            # Events come in document order, so whatever was parsed past the first state
+            # vector is ignored wherever the chunks happen to split
+            for event, element in parser.read_events():
+                if root is None:
+                    root = element
+                if event == 'start' and element.tag == 'stateVector':
+                    reached_state_vectors = True
+                    break
+                if event == 'end' and element.tag == 'COMMENT' and element.getparent().tag == 'data':
+                    comments.append(_element_to_dict(element))
+            if reached_state_vectors:
+                break
+    except etree.XMLSyntaxError as exception:
+        logging.error(f"Error parsing XML data: {exception}")
+        return
+
+    if root is None:
+        logging.error("Error parsing XML data: Empty document")
+        return
+
+    oem = {}
+    header = root.find('oem/header')
+    if header is not None:
+        oem['header'] = _element_to_dict(header)
+    segment = {'data': {'COMMENT': comments}}
+    metadata = root.find('oem/body/segment/metadata')
+    if metadata is not None:
+        segment['metadata'] = _element_to_dict(metadata)
+    oem['body'] = {'segment': segment}
+
+    return {root.tag: {'oem': oem}}
+
+def serialize_epochs(arrays: Dict[str, np.ndarray]) -> Tuple[bytes, np.ndarray]:
+    """
+    Serializes every epoch in the state vector arrays as a JSON list with orjson,
+    recording where each epoch's object starts
+
+    Args:
+        arrays (Dict[str, np.ndarray]): The state vector arrays
+
+    Returns:
+        Tuple[bytes, np.ndarray]: The JSON list, and the byte offset each epoch starts
+        at (plus a final entry one past the closing bracket's position)
+    """
+    parts = [orjson.dumps(epoch_dict(arrays, i), option=orjson.OPT_SORT_KEYS) for i in range(arrays['ts'].size)]
+    offsets = np.ones(len(parts) + 1, dtype=np.int64)
+    offsets[1:] += np.cumsum([len(part) + 1 for part in parts], dtype=np.int64)
+    return b'[' + b','.join(parts) + b']', offsets
+
+def slice_epochs_json(epochs_json: bytes, offsets: np.ndarray, start: int, stop: int) -> bytes:
+    """
+    Cuts the JSON list of epochs[start:stop] out of a serialized list without re-encoding it
+
+    Args:
+        epochs_json (bytes): The JSON list from serialize_epochs
+        offsets (np.ndarray): The epoch offsets from serialize_epochs
+        start (int): The first epoch to include
+        stop (int): One past the last epoch to include
+
+    Returns:
+        bytes: The JSON list of the selected epochs
+    """
+    if stop <= start:
+        return b'[]'
+    if start == 0 and stop == offsets.size - 1:
+        return epochs_json
+    return b'[' + epochs_json[offsets[start]:offsets[stop] - 1] + b']'
+
+@njit(cache=True)
+def _speeds(dx: np.ndarray, dy: np.ndarray, dz: np.ndarray) -> np.ndarray:
+    """
+    Calculates the instantaneous speed of every epoch from its velocity components
+    in one pass over the three arrays. Numba compiles this for the host CPU, so the
+    loop is vectorized with whatever SIMD (e.g. AVX2/AVX-512) the machine has. No
+    fastmath, so each speed matches calculate_instantaneous_speed exactly
+
+    Args:
+        dx (np.ndarray): X velocity components
+        dy (np.ndarray): Y velocity components
+        dz (np.ndarray): Z velocity components
+
+    Returns:
+        np.ndarray: The speeds
+    """
+    speeds = np.empty(dx.size)
+    for i in range(dx.size):
+        speeds[i] = math.sqrt(dx[i] * dx[i] + dy[i] * dy[i] + dz[i] * dz[i])
+    return speeds
+
+def build_arrays(formatted_data: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Builds one array per field from the formatted data, the same layout
+    parse_state_vectors produces, so calculations can run over whole columns at once
 
     Args:
         formatted_data (List[Dict[str, Any]]): A list of dictionaries containing formatted data
 
+    Returns:
+        Dict[str, np.ndarray]: Arrays of 'x', 'y', 'z', 'dx', 'dy' and 'dz' values, plus
+        'timestamp', 'ts' (the timestamps in microseconds since the Unix epoch), and
+        'speed' (the instantaneous speed of each epoch)
+    """
+    n = len(formatted_data)
+    arrays = {key: np.fromiter((data[key] for data in formatted_data), np.float64, count=n)
+              for key in _STATE_VECTOR_TAGS}
+    arrays['timestamp'] = np.array([data['timestamp'] for data in formatted_data], dtype=_TIMESTAMP_DTYPE)
+    arrays['ts'] = np.fromiter((_timestamp_us(data['timestamp']) for data in formatted_data), np.int64, count=n)
+    arrays['speed'] = _speeds(arrays['dx'], arrays['dy'], arrays['dz'])
+    return arrays
+
+def calculate_data_range(formatted_data: Union[List[Dict[str, Any]], Dict[str, np.ndarray]]) -> Tuple[str, str]:
+    """
+    Calculates the range of data based on the first and last timestamps
+
+    Args:
+        formatted_data (Union[List[Dict[str, Any]], Dict[str, np.ndarray]]): A list of dictionaries containing formatted data, or the state vector arrays
+
     Returns:
         tuple[str]: The first and last timestamps
     """
     try:
+        if isinstance(formatted_data, dict):
+            timestamps = formatted_data['timestamp']
+            return str(timestamps[0]), str(timestamps[-1])
         first_epoch = formatted_data[0]['timestamp']
         last_epoch = formatted_data[-1]['timestamp']
         return first_epoch, last_epoch
@@ -159,40 +719,126 @@ def calculate_data_range(formatted_data: List[Dict[str, Any]]) -> Tuple[str, str
         logging.error("Error: Empty formatted_data list")
         return
 
-def find_closest_epoch(formatted_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+def find_epochs_between(timestamps: np.ndarray, since: int = None, until: int = None) -> Tuple[int, int]:
+    """
+    Binary searches a sorted array of epoch timestamps for the epochs within a time range
+
+    Args:
+        timestamps (np.ndarray): Sorted epoch timestamps in microseconds since the Unix epoch
+        since (int): The earliest timestamp to include, or None for no lower bound
+        until (int): The latest timestamp to include, or None for no upper bound
+
+    Returns:
+        Tuple[int, int]: The index of the first epoch in the range, and one past the last
+    """
+    start = 0 if since is None else int(np.searchsorted(timestamps, since, side='left'))
+    stop = timestamps.size if until is None else int(np.searchsorted(timestamps, until, side='right'))
+    return start, stop
+
+def find_closest_index(timestamps: np.ndarray) -> int:
+    """
+    Binary searches a sorted array of epoch timestamps for the one closest to the
+    current time. The last result is remembered and reused while it is still closest
+
+    Args:
+        timestamps (np.ndarray): Sorted epoch timestamps in microseconds since the Unix epoch
+
+    Returns:
+        int: The index of the closest epoch
+    """
+    n = timestamps.size
+    if n == 0:
+        raise ValueError("Empty timestamps array")
+    now = time.time_ns() // 1000
+
+    index = _CACHE['closest']
+    if (index is not None and index < n
+            and (index == 0 or now - timestamps[index - 1] > timestamps[index] - now)
+            and (index == n - 1 or timestamps[index + 1] - now >= now - timestamps[index])):
+        return index
+
+    index = int(np.searchsorted(timestamps, now))
+    if index == n or (index > 0 and now - timestamps[index - 1] <= timestamps[index] - now):
+        index -= 1
+    _CACHE['closest'] = index
+    return index
+
+def find_closest_epoch(formatted_data: List[Dict[str, Any]], timestamps: np.ndarray = None) -> Dict[str, Any]:
     """
-    Finds the epoch closest to the current time in the formatted data
+    Finds the epoch closest to the current time in the formatted data. With a
+    timestamps array this is a binary search; otherwise the list is walked from
+    whichever end is nearer the current time, stopping as soon as the distance
+    starts growing again (the epochs are sorted, so it can only keep growing)
 
     Args:
         formatted_data (List[Dict[str, Any]]): A list of dictionaries containing formatted data
+        timestamps (np.ndarray): The 'ts' array built from formatted_data, if there is one
 
     Returns:
         Dict[str, [str,float]]: The dictionary representing the closest epoch
     """
     try:
-        current_time = datetime.now(pytz.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
-        current_time = datetime.strptime(current_time, '%Y-%m-%d %H:%M:%S.%f')
-        closest_epoch = min(formatted_data, key=lambda x: abs(current_time - datetime.strptime(x['timestamp'], '%Y-%m-%d %H:%M:%S.%f')))
+        if timestamps is not None:
+            return formatted_data[find_closest_index(timestamps)]
+
+        now = time.time_ns() // 1000
+        first = _timestamp_us(formatted_data[0]['timestamp'])
+        last = _timestamp_us(formatted_data[-1]['timestamp'])
+        if now - first > last - now:
+            indices = range(len(formatted_data) - 1, -1, -1)
+        else:
+            indices = range(len(formatted_data))
+
+        closest, closest_error = None, None
+        for i in indices:
+            error = abs(now - _timestamp_us(formatted_data[i]['timestamp']))
+            if closest is not None and error > closest_error:
+                break
+            if closest is None or error < closest_error or (error == closest_error and i < closest):
+                closest, closest_error = i, error
+
+        closest_epoch = formatted_data[closest]
         return closest_epoch
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, KeyError, IndexError):
         logging.error("Error: Unable to calculate closest epoch")
         return
 
-def calculate_average_speed(formatted_data: List[Dict[str, Any]]) -> float:
+@njit(fastmath=True, cache=True)
+def _average_speed(dx: np.ndarray, dy: np.ndarray, dz: np.ndarray) -> float:
+    """
+    Averages the velocity magnitudes in a single fused pass over the three arrays.
+    Compiled with Numba; cache=True keeps the compiled kernel on disk between runs
+
+    Args:
+        dx (np.ndarray): X velocity components
+        dy (np.ndarray): Y velocity components
+        dz (np.ndarray): Z velocity components
+
+    Returns:
+        float: The average speed
+    """
+    total = 0.0
+    for i in range(dx.size):
+        total += math.sqrt(dx[i] * dx[i] + dy[i] * dy[i] + dz[i] * dz[i])
+    return total / dx.size
+
+def calculate_average_speed(formatted_data: Union[List[Dict[str, Any]], Dict[str, np.ndarray]]) -> float:
     """
     Calculates the average speed based on the formatted data
 
     Args:
-        formatted_data (List[Dict[str, Any]]): A list of dictionaries containing formatted data
+        formatted_data (Union[List[Dict[str, Any]], Dict[str, np.ndarray]]): A list of dictionaries containing formatted data, or the arrays built from it by build_arrays
 
     Returns:
         float: The average speed
     """
     try:
-        total_speed = 0
-        for data in formatted_data:
-            total_speed += math.sqrt(data['dx'] ** 2 + data['dy'] ** 2 + data['dz'] ** 2)
-        return total_speed / len(formatted_data)
+        if isinstance(formatted_data, list):
+            formatted_data = build_arrays(formatted_data)
+        dx, dy, dz = formatted_data['dx'], formatted_data['dy'], formatted_data['dz']
+        if dx.size == 0:
+            raise ZeroDivisionError
+        return float(_average_speed(dx, dy, dz))
     except (KeyError, TypeError):
         logging.error("Error: Missing or incorrect keys in closest_epoch")
         return
@@ -217,6 +863,86 @@ def calculate_instantaneous_speed(closest_epoch: Dict[str, Any]) -> float:
         logging.error("Error: Missing or incorrect keys in closest_epoch")
         return
 
+@functools.lru_cache(maxsize=None)
+def _astropy() -> Tuple[Any, Any, Any]:
+    """
+    Imports astropy on first use instead of at startup, since only the location
+    routes need it and it is slow and memory-hungry to import
+
+    Returns:
+        Tuple[Any, Any, Any]: The astropy.coordinates and astropy.units modules, and astropy.time.Time
+    """
+    from astropy import coordinates, units
+    from astropy.time import Time
+    return coordinates, units, Time
+
+@functools.lru_cache(maxsize=None)
+def _geocoder() -> Any:
+    """
+    Imports geopy and creates the Nominatim geocoder on first use instead of at startup
+
+    Returns:
+        Nominatim: The geocoder
+    """
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent="iss_tracker")
+
+@functools.lru_cache(maxsize=4096)
+def _reverse_geocode(lat: float, lon: float) -> str:
+    """
+    Looks up the address at a position with Nominatim. Callers round to 0.01 degrees
+    (~1 km) so nearby positions share a cached result instead of a new HTTP request
+
+    Args:
+        lat (float): Latitude in degrees
+        lon (float): Longitude in degrees
+
+    Returns:
+        str: The address, or "Over Ocean or Unknown" if there is none
+    """
+    geoloc = _geocoder().reverse((lat, lon), zoom=15, language='en')
+    return geoloc.address if geoloc else "Over Ocean or Unknown"
+
+def cartesian_to_geo_batch(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Converts the cartesian coordinates of many epochs to Latitude Longitude and Altitude
+    using a single array-valued astropy transform
+
+    Args:
+        arrays (Dict[str, np.ndarray]): The 'ts', 'x', 'y' and 'z' arrays, as built by build_arrays
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays of 'lat', 'lon' and 'alt' in degrees & km
+    """
+    coordinates, units, Time = _astropy()
+
+    try:
+        unix_timestamps = Time(arrays['ts'] / 1e6, format='unix', scale='utc')
+    except (KeyError, TypeError):
+        logging.error("Error: Missing or incorrect timestamp array")
+        return
+
+    try:
+        cart = coordinates.CartesianRepresentation(arrays['x'], arrays['y'], arrays['z'], unit=units.km)
+        gcrs = coordinates.GCRS(cart, obstime=unix_timestamps)
+        itrs = gcrs.transform_to(coordinates.ITRS(obstime=unix_timestamps))
+        ears = coordinates.EarthLocation.from_geocentric(itrs.x, itrs.y, itrs.z)
+    except (KeyError, TypeError):
+        logging.error("Error: Missing or incorrect positional arrays")
+        return
+    except Exception:
+        logging.error("Error: Something went wrong with coordinate transformations")
+        return
+
+    # ITRS is Earth-fixed, so its longitude needs no extra rotation, just wrapping to [-180, 180)
+    lon = np.remainder(ears.lon.deg + 180.0, 360.0) - 180.0
+
+    return {
+        'lat': ears.lat.deg,
+        'lon': lon,
+        'alt': ears.height.value
+    }
+
 def cartesian_to_geo(epoch: Dict[str, Any]) -> Dict[str,Any]:
     """
     Converts an epoch's cartesian coordinates to Latitude Longitude and Altitude
@@ -228,35 +954,36 @@ def cartesian_to_geo(epoch: Dict[str, Any]) -> Dict[str,Any]:
         Dict[str,Any]: Dictionary containing Latitude Longitude and Altitude in degrees & km
     """
     try:
-        unix_timestamp = datetime.strptime(epoch['timestamp'], '%Y-%m-%d %H:%M:%S.%f').timestamp()
-        unix_timestamp = Time(unix_timestamp, format='unix', scale='utc')
-    except (KeyError, TypeError):
+        timestamps = np.array([_timestamp_us(epoch['timestamp'])], dtype=np.int64)
+    except (KeyError, TypeError, ValueError):
         logging.error("Error: Missing or incorrect timestamp key in epoch")
         return
 
     try:
-        cart = coordinates.CartesianRepresentation(*[epoch['x'], epoch['y'], epoch['z']], unit=units.km)
-        gcrs = coordinates.GCRS(cart, obstime=unix_timestamp)
-        itrs = gcrs.transform_to(coordinates.ITRS(obstime=unix_timestamp))
-        ears = coordinates.EarthLocation(*itrs.cartesian.xyz)
-    except (KeyError, TypeError):
+        arrays = {
+            'ts': timestamps,
+            'x': np.array([epoch['x']], dtype=np.float64),
+            'y': np.array([epoch['y']], dtype=np.float64),
+            'z': np.array([epoch['z']], dtype=np.float64)
+        }
+    except (KeyError, TypeError, ValueError):
         logging.error("Error: Missing or incorrect positional keys in epoch")
         return
-    except:
-        logging.error("Error: Something went wrong with coordinate transformations")
 
-    lon = ears.lon.deg + 90 - 15 # ?????
-    if lon > 180:
-        lon -= 180*2
+    geo_arrays = cartesian_to_geo_batch(arrays)
+    if geo_arrays is None:
+        return
+    lat = float(geo_arrays['lat'][0])
+    lon = float(geo_arrays['lon'][0])
 
-    geoloc = geocoder.reverse((ears.lat.deg, lon), zoom=15, language='en')
+    geoloc = _reverse_geocode(round(lat, 2), round(lon, 2))
 
     geo = []
     geo.append({
-        'lat': ears.lat.deg,
+        'lat': lat,
         'lon': lon,
-        'alt': ears.height.value,
-        'geoloc': geoloc.address if geoloc else "Over Ocean or Unknown"
+        'alt': float(geo_arrays['alt'][0]),
+        'geoloc': geoloc
     })
     return geo
 
@@ -268,7 +995,7 @@ def get_header():
     Returns:
     - dict: header information
     """
-    data_dict = fetch_data()
+    data_dict = fetch_prefix()
     formatted_header = format_header(data_dict)
 
     return formatted_header
@@ -281,7 +1008,7 @@ def get_comment():
     Returns:
     - list: comment strings
     """
-    data_dict = fetch_data()
+    data_dict = fetch_prefix()
     formatted_comment = format_comment(data_dict)
 
     return formatted_comment
@@ -294,7 +1021,7 @@ def get_metadata():
     Returns:
     - dict: metadata information
     """
-    data_dict = fetch_data()
+    data_dict = fetch_prefix()
     formatted_metadata = format_metadata(data_dict)
 
     return formatted_metadata
@@ -303,23 +1030,38 @@ def get_metadata():
 @app.route('/epochs', methods=['GET'])
 def get_epochs():
     """
-    Fetches data and returns subset of epochs based on parameters
+    Fetches data and returns subset of epochs based on parameters. 'since' and
+    'until' (format 'YYYY-MM-DD__HH_MM_SS.SSSSSS', or a prefix of it) restrict the
+    epochs to a time range, inclusive, before 'offset' and 'limit' are applied. A
+    bare date for 'until' includes the whole of that day
 
     Returns:
     - list: Formatted epochs data
     """
-    data_dict = fetch_data()
-    formatted_data = format_data(data_dict)
+    # Fetch outside the lock, then take the arrays and JSON from the same file
+    _fetch_content()
+    with _CACHE_LOCK:
+        timestamps = _cached_arrays()['ts']
+        epochs_json, offsets = _cached_epochs_json()
 
     limit = request.args.get('limit', default=None, type=int)
     offset = request.args.get('offset', default=0, type=int)
 
+    try:
+        since, until = request.args.get('since'), request.args.get('until')
+        since = _query_timestamp_us(since) if since is not None else None
+        until = _query_timestamp_us(until, end_of_day=True) if until is not None else None
+    except (ValueError, TypeError):
+        return {'error': 'Invalid since/until timestamp'}, 400
+
+    indices = range(*find_epochs_between(timestamps, since, until))
     if limit is not None:
-        formatted_data = formatted_data[offset:offset+limit]
+        indices = indices[offset:offset+limit]
     else:
-        formatted_data = formatted_data[offset:]
+        indices = indices[offset:]
+    start, stop = indices.start, indices.stop
 
-    return formatted_data
+    return Response(slice_epochs_json(epochs_json, offsets, start, stop), mimetype='application/json')
 
 @app.route('/epochs/<epoch>', methods=['GET'])
 def get_epoch(epoch):
@@ -332,13 +1074,14 @@ def get_epoch(epoch):
     Returns:
     - dict: A dictionary containing the epoch data if found
     """
-    epoch = epoch.replace("__", " ").replace("_", ":")
-    data_dict = fetch_data()
-    formatted_data = format_data(data_dict)
-    for data in formatted_data:
-        if data['timestamp'] == epoch:
-            return data
-    return {'error': 'Epoch not found'}, 404
+    _fetch_content()
+    with _CACHE_LOCK:
+        arrays = _cached_arrays()
+        index = find_epoch_index(_cached_index(), epoch)
+    if index is None:
+        return {'error': 'Epoch not found'}, 404
+    data = epoch_dict(arrays, index)
+    return data
 
 @app.route('/epochs/<epoch>/speed', methods=['GET'])
 def get_epoch_speed(epoch):
@@ -351,14 +1094,14 @@ def get_epoch_speed(epoch):
     Returns:
     - dict: A dictionary containing the epoch's state vector and instantaneous speed
     """
-    epoch = epoch.replace("__", " ").replace("_", ":")
-    data_dict = fetch_data()
-    formatted_data = format_data(data_dict)
-    for data in formatted_data:
-        if data['timestamp'] == epoch:
-            speed = calculate_instantaneous_speed(data)
-            return {'speed': speed}
-    return {'error': 'Epoch not found'}, 404
+    _fetch_content()
+    with _CACHE_LOCK:
+        arrays = _cached_arrays()
+        index = find_epoch_index(_cached_index(), epoch)
+    if index is None:
+        return {'error': 'Epoch not found'}, 404
+    speed = float(arrays['speed'][index])
+    return {'speed': speed}
 
 @app.route('/epochs/<epoch>/location', methods=['GET'])
 def get_epoch_location(epoch):
@@ -371,14 +1114,15 @@ def get_epoch_location(epoch):
     Returns:
     - dict: A dictionary containing the epoch's latitude, longitude, altitude, and geoposition
     """
-    epoch = epoch.replace("__", " ").replace("_", ":")
-    data_dict = fetch_data()
-    formatted_data = format_data(data_dict)
-    for data in formatted_data:
-        if data['timestamp'] == epoch:
-            geo = cartesian_to_geo(data)
-            return geo
-    return {'error': 'Epoch not found'}, 404
+    _fetch_content()
+    with _CACHE_LOCK:
+        arrays = _cached_arrays()
+        index = find_epoch_index(_cached_index(), epoch)
+    if index is None:
+        return {'error': 'Epoch not found'}, 404
+    data = epoch_dict(arrays, index)
+    geo = cartesian_to_geo(data)
+    return geo
 
 @app.route('/now', methods=['GET'])
 def get_now():
@@ -388,13 +1132,17 @@ def get_now():
     Returns:
     - dict: A dictionary containing the closest epoch timestamp and its associated speed
     """
-    data_dict = fetch_data()
-    formatted_data = format_data(data_dict)
-    closest_epoch = find_closest_epoch(formatted_data)
-    speed = calculate_instantaneous_speed(closest_epoch)
+    arrays = get_arrays()
+    try:
+        index = find_closest_index(arrays['ts'])
+    except ValueError:
+        logging.error("Error: Unable to calculate closest epoch")
+        return {'closest_epoch': None, 'speed': None, 'geo': None}
+    closest_epoch = epoch_dict(arrays, index)
+    speed = float(arrays['speed'][index])
     geo = cartesian_to_geo(closest_epoch)
     return {'closest_epoch': closest_epoch, 'speed': speed, 'geo': geo}
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', debug=True)
+    app.run(host='0.0.0.0')
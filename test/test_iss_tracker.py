@@ -2,8 +2,11 @@
 
 import pytest
 import math
+import json
 from iss_tracker import fetch_data, format_data, calculate_data_range, find_closest_epoch, calculate_average_speed, calculate_instantaneous_speed
-from iss_tracker import format_header, format_metadata, format_comment, cartesian_to_geo
+from iss_tracker import format_header, format_metadata, format_comment, cartesian_to_geo, cartesian_to_geo_batch
+from iss_tracker import get_arrays, epoch_dict, serialize_epochs, slice_epochs_json, parse_state_vectors, build_arrays, find_closest_index, parse_prefix
+from iss_tracker import find_epochs_between
 
 import requests
 from flask import Flask, request
@@ -114,6 +117,49 @@ test_formatted_data = [
     }
     ]
 
+test_xml = b'''<?xml version="1.0" encoding="UTF-8"?>
+<ndm>
+  <oem id="CCSDS_OEM_VERS" version="2.0">
+    <header>
+      <TEST1>TEST1 VALUE</TEST1>
+      <TEST2>TEST2 VALUE</TEST2>
+    </header>
+    <body>
+      <segment>
+        <metadata>
+          <TEST1>TEST1 VALUE</TEST1>
+          <TEST2>TEST2 VALUE</TEST2>
+        </metadata>
+        <data>
+          <COMMENT>COMMENT LINE 1</COMMENT>
+          <COMMENT>COMMENT LINE 2</COMMENT>
+          <stateVector>
+            <EPOCH>1000-001T00:00:00.000Z</EPOCH>
+            <X units="km">1</X><Y units="km">-2</Y><Z units="km">3</Z>
+            <X_DOT units="km/s">4</X_DOT><Y_DOT units="km/s">-5</Y_DOT><Z_DOT units="km/s">6</Z_DOT>
+          </stateVector>
+          <stateVector>
+            <EPOCH>1000-002T00:00:00.000Z</EPOCH>
+            <X units="km">-7</X><Y units="km">8</Y><Z units="km">-9</Z>
+            <X_DOT units="km/s">10</X_DOT><Y_DOT units="km/s">-11</Y_DOT><Z_DOT units="km/s">12</Z_DOT>
+          </stateVector>
+          <stateVector>
+            <EPOCH>1000-003T00:00:00.000Z</EPOCH>
+            <X units="km">13</X><Y units="km">-14</Y><Z units="km">15</Z>
+            <X_DOT units="km/s">16</X_DOT><Y_DOT units="km/s">-17</Y_DOT><Z_DOT units="km/s">18</Z_DOT>
+          </stateVector>
+          <stateVector>
+            <EPOCH>1000-004T00:00:00.000Z</EPOCH>
+            <X units="km">-19</X><Y units="km">20</Y><Z units="km">-21</Z>
+            <X_DOT units="km/s">22</X_DOT><Y_DOT units="km/s">-23</Y_DOT><Z_DOT units="km/s">24</Z_DOT>
+          </stateVector>
+        </data>
+      </segment>
+    </body>
+  </oem>
+</ndm>
+'''
+
 # Part 1
 
 def test_fetch_data():
@@ -121,12 +167,52 @@ def test_fetch_data():
     assert isinstance(data_dict, dict)
     assert len(data_dict) > 0
 
+def test_fetch_data_cached():
+    data_dict0 = fetch_data()
+    data_dict1 = fetch_data()
+    assert isinstance(data_dict0, dict)
+    assert data_dict0 is data_dict1
+
+def test_get_arrays():
+    arrays0 = get_arrays()
+    arrays1 = get_arrays()
+    assert isinstance(arrays0, dict)
+    assert arrays0['ts'].size > 0
+    assert arrays0 is arrays1
+
 def test_format_data():
     formatted_data = format_data(test_data_dict)
     assert isinstance(formatted_data, list)
     assert all(isinstance(item, dict) for item in formatted_data)
     assert formatted_data == test_formatted_data
 
+def test_format_data_invalid_epoch():
+    data_dict = {'ndm': {'oem': {'body': {'segment': {'data': {'stateVector': [
+        dict(test_data_dict['ndm']['oem']['body']['segment']['data']['stateVector'][0], EPOCH='1000-001T00:00:60.000Z'),
+        test_data_dict['ndm']['oem']['body']['segment']['data']['stateVector'][1],
+        dict(test_data_dict['ndm']['oem']['body']['segment']['data']['stateVector'][2], EPOCH='1000-002T-1:00:00.000Z'),
+        dict(test_data_dict['ndm']['oem']['body']['segment']['data']['stateVector'][2], EPOCH='1000-002T 1:00:00.000Z'),
+        dict(test_data_dict['ndm']['oem']['body']['segment']['data']['stateVector'][2], EPOCH='+000-002T01:00:00.000Z'),
+    ]}}}}}}
+    assert format_data(data_dict) == test_formatted_data[1:2]
+
+def test_parse_state_vectors():
+    arrays = parse_state_vectors(test_xml)
+    expected_arrays = build_arrays(test_formatted_data)
+    assert arrays.keys() == expected_arrays.keys()
+    assert all(list(arrays[key]) == list(expected_arrays[key]) for key in arrays)
+
+def test_epoch_dict():
+    arrays = parse_state_vectors(test_xml)
+    assert [epoch_dict(arrays, i) for i in range(len(arrays['ts']))] == test_formatted_data
+
+def test_serialize_epochs():
+    epochs_json, offsets = serialize_epochs(parse_state_vectors(test_xml))
+    assert json.loads(epochs_json) == test_formatted_data
+    assert json.loads(slice_epochs_json(epochs_json, offsets, 0, 4)) == test_formatted_data
+    assert json.loads(slice_epochs_json(epochs_json, offsets, 1, 3)) == test_formatted_data[1:3]
+    assert json.loads(slice_epochs_json(epochs_json, offsets, 3, 1)) == []
+
 def test_calculate_data_range():
     formatted_data = format_data(test_data_dict)
     first_epoch, last_epoch = calculate_data_range(formatted_data)
@@ -134,6 +220,14 @@ def test_calculate_data_range():
     assert isinstance(last_epoch, str)
     assert first_epoch == '1000-01-01 00:00:00.000000'
     assert last_epoch == '1000-01-04 00:00:00.000000'
+    assert calculate_data_range(build_arrays(formatted_data)) == (first_epoch, last_epoch)
+
+def test_find_epochs_between():
+    timestamps = build_arrays(format_data(test_data_dict))['ts']
+    assert find_epochs_between(timestamps) == (0, 4)
+    assert find_epochs_between(timestamps, since=timestamps[1]) == (1, 4)
+    assert find_epochs_between(timestamps, until=timestamps[2]) == (0, 3)
+    assert find_epochs_between(timestamps, since=timestamps[1] + 1, until=timestamps[2] - 1) == (2, 2)
 
 def test_find_closest_epoch():
     formatted_data = format_data(test_data_dict)
@@ -141,12 +235,25 @@ def test_find_closest_epoch():
     assert isinstance(closest_epoch, dict)
     assert closest_epoch['timestamp'] == '1000-01-04 00:00:00.000000'
 
+def test_find_closest_index():
+    arrays = build_arrays(format_data(test_data_dict))
+    assert find_closest_index(arrays['ts']) == 3
+    assert find_closest_index(arrays['ts']) == 3
+    assert find_closest_index(arrays['ts'][:2]) == 1
+
 def test_calculate_average_speed():
     formatted_data = format_data(test_data_dict)
     average_speed = calculate_average_speed(formatted_data)
     assert isinstance(average_speed, float)
     assert math.isclose(average_speed, 24.31, rel_tol=1)
 
+def test_build_arrays():
+    arrays = build_arrays(format_data(test_data_dict))
+    assert list(arrays['x']) == [1.0, -7.0, 13.0, -19.0]
+    assert list(arrays['dz']) == [6.0, 12.0, 18.0, 24.0]
+    assert list(arrays['speed']) == [calculate_instantaneous_speed(data) for data in format_data(test_data_dict)]
+    assert calculate_average_speed(arrays) == calculate_average_speed(format_data(test_data_dict))
+
 def test_calculate_instantaneous_speed():
     formatted_data = format_data(test_data_dict)
     closest_epoch = find_closest_epoch(formatted_data)
@@ -164,6 +271,24 @@ def test_get_epochs():
 
     assert response0.json()[4-2]['timestamp'] == response1.json()[4]['timestamp']
 
+def test_get_epochs_range():
+    response0 = requests.get('http://localhost:5000/epochs?limit=5')
+    assert response0.status_code == 200
+    since = response0.json()[1]['timestamp'].replace(" ", "__").replace(":", "_")
+    until = response0.json()[3]['timestamp'].replace(" ", "__").replace(":", "_")
+
+    response1 = requests.get(f'http://localhost:5000/epochs?since={since}&until={until}')
+    assert response1.status_code == 200
+    assert response1.json() == response0.json()[1:4]
+
+    response2 = requests.get('http://localhost:5000/epochs?since=not-a-time')
+    assert response2.status_code == 400
+
+    day = response0.json()[0]['timestamp'][:10]
+    response3 = requests.get(f'http://localhost:5000/epochs?since={since}&until={day}')
+    assert response3.status_code == 200
+    assert all(epoch['timestamp'][:10] == day for epoch in response3.json())
+
 def test_get_epoch():
     response0 = requests.get('http://localhost:5000/epochs?limit=1')
     assert response0.status_code == 200
@@ -218,6 +343,19 @@ def test_format_comment():
     ]
     assert comment == expected_comment
 
+def test_parse_prefix():
+    chunks = [test_xml[i:i+64] for i in range(0, len(test_xml), 64)]
+    data_dict = parse_prefix(chunks)
+    assert format_header(data_dict) == format_header(test_data_dict)
+    assert format_metadata(data_dict) == format_metadata(test_data_dict)
+    assert format_comment(data_dict) == format_comment(test_data_dict)
+
+    xml = (b'<ndm><oem><body><segment><data><COMMENT>  a </COMMENT><stateVector><EPOCH>1000-001T00:00:00.000Z</EPOCH>'
+           b'</stateVector><COMMENT>trailing</COMMENT></data></segment></body></oem></ndm>')
+    for size in (16, 64, len(xml)):
+        data_dict = parse_prefix(xml[i:i+size] for i in range(0, len(xml), size))
+        assert format_comment(data_dict) == ['a']
+
 def test_cartesian_to_geo():
     epoch = {
         'timestamp': '2024-03-17 12:00:00.000000',
@@ -233,6 +371,13 @@ def test_cartesian_to_geo():
     assert isinstance(geo[0]['alt'], float)
     assert isinstance(geo[0]['geoloc'], str)
 
+def test_cartesian_to_geo_batch():
+    arrays = build_arrays(format_data(test_data_dict))
+    geo = cartesian_to_geo_batch(arrays)
+    assert len(geo['lat']) == len(arrays['x'])
+    assert all(-90 <= lat <= 90 for lat in geo['lat'])
+    assert all(-180 <= lon <= 180 for lon in geo['lon'])
+
 def test_get_header():
     response0 = requests.get('http://localhost:5000/header')
     assert response0.status_code == 200